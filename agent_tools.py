@@ -1,63 +1,241 @@
 """
 Advanced tools and capabilities for the Karbon AI Agent
 """
+import heapq
 import json
 import re
+import time
 import requests
+from collections import Counter
+from functools import lru_cache
+from operator import itemgetter
+from types import MappingProxyType
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
+# Precompiled patterns used by the code analyzer
+_COMPLEXITY_INDICATORS = frozenset(['if', 'for', 'while', 'try', 'except', 'with', 'def', 'class'])
+# One scan yields every token the analyzer counts; the group name tells them apart
+_CODE_SCAN_RE = re.compile(
+    r'(?P<bare_except>\bexcept\s*:)'
+    r'|(?P<keyword>\b(?:%s)\b)'
+    r'|(?P<print>print\()'
+    r'|(?P<wildcard>import \*)' % '|'.join(sorted(_COMPLEXITY_INDICATORS))
+)
+_LONGLINE_RE = re.compile(r'^.{81,}$', re.M)
+
+# Precompiled patterns used by the text summarizer
+_WORD_RE = re.compile(r'\w{4,}')
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+# TextRank works on dense sentence x term and sentence x sentence matrices;
+# larger inputs are scored by word frequency instead
+_TEXTRANK_MAX_SENTENCES = 500
+_TEXTRANK_MAX_TERMS = 5000
+
+# Last formatted timestamp, as [epoch seconds, ISO-8601 string]
+_NOW_ISO_CACHE = [0.0, ""]
+
+def _now_iso() -> str:
+    """Return the current time in ISO-8601, reformatted at most every 0.5s"""
+    now = time.time()
+    if now - _NOW_ISO_CACHE[0] > 0.5:
+        _NOW_ISO_CACHE[0] = now
+        _NOW_ISO_CACHE[1] = datetime.fromtimestamp(now).isoformat()
+    return _NOW_ISO_CACHE[1]
+
+# Static frameworks returned by the research and creative tools
+_RESEARCH_AREAS = (
+    "Background and definition",
+    "Current state and trends",
+    "Key players and stakeholders",
+    "Challenges and opportunities",
+    "Future predictions and implications"
+)
+
+_SUGGESTED_SOURCES = (
+    "Academic databases",
+    "Industry reports",
+    "Government publications",
+    "Expert interviews",
+    "Case studies"
+)
+
+_CREATIVE_TEMPLATES = MappingProxyType({
+    "story_outline": MappingProxyType({
+        "structure": ("Setup", "Inciting Incident", "Rising Action", "Climax", "Falling Action", "Resolution"),
+        "elements": ("Character", "Setting", "Conflict", "Theme", "Plot Twist")
+    }),
+    "brainstorm": MappingProxyType({
+        "techniques": ("Mind Mapping", "SCAMPER", "Six Thinking Hats", "Random Word", "What If..."),
+        "categories": ("Traditional", "Innovative", "Disruptive", "Improvement", "Combination")
+    }),
+    "content_ideas": MappingProxyType({
+        "formats": ("Blog Post", "Video", "Infographic", "Podcast", "Social Media", "Newsletter"),
+        "angles": ("How-to", "List", "Case Study", "Interview", "Review", "Comparison")
+    })
+})
+
+# Step templates used by the task planner
+_TASK_TEMPLATES = MappingProxyType({
+    "coding_project": (
+        "Define requirements",
+        "Design architecture", 
+        "Set up development environment",
+        "Implement core features",
+        "Add error handling",
+        "Write tests",
+        "Documentation",
+        "Code review",
+        "Deployment preparation"
+    ),
+    "research_project": (
+        "Define research question",
+        "Literature review",
+        "Methodology selection",
+        "Data collection",
+        "Data analysis", 
+        "Results interpretation",
+        "Report writing",
+        "Peer review",
+        "Presentation preparation"
+    ),
+    "content_creation": (
+        "Topic research",
+        "Audience analysis",
+        "Content outline",
+        "First draft",
+        "Review and edit",
+        "Visual elements",
+        "SEO optimization",
+        "Proofreading",
+        "Publishing and promotion"
+    )
+})
+
+_GENERIC_TASK_STEPS = (
+    "Analyze requirements",
+    "Plan approach",
+    "Execute main task",
+    "Review and refine",
+    "Finalize and deliver"
+)
+
+# Fields shared by every planned step
+_STEP_DEFAULTS = MappingProxyType({
+    "status": "Not Started",
+    "estimated_time": "TBD",
+    "dependencies": ()
+})
+
+@lru_cache(maxsize=2048)
+def _research_framework(topic: str) -> Dict[str, tuple]:
+    """Build the research framework for a topic (cached, so values are immutable tuples)"""
+    return {
+        "key_questions": (
+            f"What is {topic}?",
+            f"Why is {topic} important?",
+            f"What are the current trends in {topic}?",
+            f"What are the challenges related to {topic}?",
+            f"What is the future outlook for {topic}?"
+        ),
+        "research_areas": _RESEARCH_AREAS,
+        "suggested_sources": _SUGGESTED_SOURCES
+    }
+
+def _frequency_scores(sentence_words: List[List[str]], word_freq: Counter) -> np.ndarray:
+    """Score each (non-empty) sentence by the mean corpus frequency of its words"""
+    lengths = np.fromiter(map(len, sentence_words), dtype=np.int64, count=len(sentence_words))
+    weights = np.fromiter(
+        (word_freq[word] for words in sentence_words for word in words),
+        dtype=np.float64,
+        count=int(lengths.sum())
+    )
+    
+    # Sum each sentence's slice of the flat weight array in one vectorized reduction
+    offsets = np.concatenate(([0], np.cumsum(lengths[:-1])))
+    return np.add.reduceat(weights, offsets) / lengths
+
+def _textrank_scores(sentence_words: List[List[str]], damping: float = 0.85, iterations: int = 20) -> np.ndarray:
+    """Rank sentences with PageRank over their TF-IDF cosine similarity (TextRank)"""
+    vocab = {}
+    token_ids = [[vocab.setdefault(word, len(vocab)) for word in words] for words in sentence_words]
+    n = len(token_ids)
+    
+    # Sentence x term count matrix built from integer-encoded tokens
+    v = len(vocab)
+    rows = np.repeat(np.arange(n), [len(ids) for ids in token_ids])
+    cols = np.fromiter((i for ids in token_ids for i in ids), dtype=np.int64, count=len(rows))
+    tf = np.bincount(rows * v + cols, minlength=n * v).reshape(n, v).astype(np.float64)
+    
+    # Smoothed IDF weighting, then L2-normalize rows so X @ X.T is cosine similarity
+    df = np.count_nonzero(tf, axis=0)
+    tfidf = tf * (np.log((1 + n) / (1 + df)) + 1)
+    tfidf /= np.linalg.norm(tfidf, axis=1, keepdims=True)
+    sim = tfidf @ tfidf.T
+    np.fill_diagonal(sim, 0.0)
+    
+    # Row-normalize into a transition matrix; isolated sentences jump uniformly
+    row_sums = sim.sum(axis=1, keepdims=True)
+    transition = np.divide(sim, row_sums, out=np.full_like(sim, 1.0 / n), where=row_sums > 0)
+    
+    ranks = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        ranks = (1 - damping) / n + damping * (transition.T @ ranks)
+    return ranks
+
 class AgentTools:
     """Collection of tools that agents can use"""
     
-    def __init__(self):
-        self.tools = {
-            "code_analyzer": self.analyze_code,
-            "data_processor": self.process_data,
-            "text_summarizer": self.summarize_text,
-            "research_helper": self.research_helper,
-            "creative_generator": self.creative_generator
-        }
+    __slots__ = ()
+    
+    # Tool name -> method name; methods are only bound when a tool is used
+    _DISPATCH = MappingProxyType({
+        "code_analyzer": "analyze_code",
+        "data_processor": "process_data",
+        "text_summarizer": "summarize_text",
+        "research_helper": "research_helper",
+        "creative_generator": "creative_generator"
+    })
+    
+    @property
+    def tools(self) -> Dict[str, Any]:
+        """Mapping of tool names to bound tool methods"""
+        return {name: getattr(self, method) for name, method in self._DISPATCH.items()}
+    
+    def dispatch(self, name: str, *args, **kwargs) -> Dict[str, Any]:
+        """Run the tool registered under name"""
+        return getattr(self, self._DISPATCH[name])(*args, **kwargs)
     
     def analyze_code(self, code: str, language: str = "python") -> Dict[str, Any]:
         """Analyze code for potential issues and improvements"""
         analysis = {
             "language": language,
-            "lines_of_code": len(code.split('\n')),
+            "lines_of_code": code.count('\n') + 1,
             "complexity_score": 0,
             "suggestions": [],
             "issues": []
         }
         
-        # Basic code analysis
-        lines = code.split('\n')
-        
-        # Count complexity indicators
-        complexity_indicators = ['if', 'for', 'while', 'try', 'except', 'with', 'def', 'class']
-        complexity_score = 0
-        
-        for line in lines:
-            line_stripped = line.strip().lower()
-            for indicator in complexity_indicators:
-                if indicator in line_stripped:
-                    complexity_score += 1
-        
-        analysis["complexity_score"] = complexity_score
+        # Count complexity indicators and issue patterns in a single pass over the source
+        counts = Counter(match.lastgroup for match in _CODE_SCAN_RE.finditer(code))
+        analysis["complexity_score"] = counts["keyword"] + counts["bare_except"]
         
         # Basic suggestions based on patterns
         if language.lower() == "python":
             # Check for common Python issues
-            if "import *" in code:
+            if counts["wildcard"]:
                 analysis["issues"].append("Avoid wildcard imports (import *)")
             
-            if re.search(r'except:', code):
+            if counts["bare_except"]:
                 analysis["issues"].append("Use specific exception types instead of bare except")
             
-            if len([line for line in lines if len(line) > 80]) > 0:
+            if _LONGLINE_RE.search(code):
                 analysis["suggestions"].append("Consider breaking long lines (>80 characters)")
             
-            if code.count("print(") > 5:
+            if counts["print"] > 5:
                 analysis["suggestions"].append("Consider using logging instead of multiple print statements")
         
         return analysis
@@ -66,39 +244,56 @@ class AgentTools:
         """Process data and provide insights"""
         result = {
             "operation": operation,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": _now_iso(),
             "data_type": type(data).__name__,
             "result": None
         }
         
         try:
             if isinstance(data, (list, tuple)):
+                n = len(data)
                 if operation == "summary":
                     result["result"] = {
-                        "count": len(data),
-                        "data_types": list(set(type(item).__name__ for item in data)),
-                        "sample": data[:5] if len(data) > 5 else data
-                    }
-                elif operation == "statistics" and all(isinstance(x, (int, float)) for x in data):
-                    result["result"] = {
-                        "mean": sum(data) / len(data),
-                        "min": min(data),
-                        "max": max(data),
-                        "count": len(data)
+                        "count": n,
+                        "data_types": [t.__name__ for t in {type(item) for item in data}],
+                        "sample": list(data[:5])
                     }
+                elif operation == "statistics" and n:
+                    try:
+                        arr = np.asarray(data)
+                    except ValueError:
+                        arr = None
+                    
+                    # Only flat bool/int/float data; numeric strings and nested lists stay unparsed
+                    if arr is not None and arr.ndim == 1 and arr.dtype.kind in "biuf":
+                        # Index the extremes back out of data so they keep their original type
+                        result["result"] = {
+                            "mean": float(arr.mean()),
+                            "min": data[int(arr.argmin())],
+                            "max": data[int(arr.argmax())],
+                            "count": n
+                        }
+                    # Ints beyond int64 land in an object array; reduce those in Python
+                    elif arr is not None and arr.dtype.kind == "O" and all(isinstance(x, (int, float)) for x in data):
+                        result["result"] = {
+                            "mean": sum(data) / n,
+                            "min": min(data),
+                            "max": max(data),
+                            "count": n
+                        }
             
             elif isinstance(data, dict):
                 result["result"] = {
                     "keys": list(data.keys()),
                     "key_count": len(data),
-                    "value_types": list(set(type(v).__name__ for v in data.values()))
+                    "value_types": [t.__name__ for t in {type(v) for v in data.values()}]
                 }
             
             elif isinstance(data, str):
                 result["result"] = {
                     "length": len(data),
                     "word_count": len(data.split()),
-                    "line_count": len(data.split('\n'))
+                    "line_count": data.count('\n') + 1
                 }
                 
         except Exception as e:
@@ -106,74 +301,44 @@ class AgentTools:
         
         return result
     
-    def summarize_text(self, text: str, max_sentences: int = 3) -> Dict[str, Any]:
-        """Summarize text content"""
-        sentences = text.split('. ')
+    def summarize_text(self, text: str, max_sentences: int = 3, method: str = "frequency") -> Dict[str, Any]:
+        """Summarize text content by word frequency or, with method="textrank", TextRank"""
+        sentences = _SENTENCE_SPLIT_RE.split(text)
         
         # Simple extractive summarization
-        word_freq = {}
-        words = text.lower().split()
-        
-        for word in words:
-            word = re.sub(r'[^\w]', '', word)
-            if word and len(word) > 3:
-                word_freq[word] = word_freq.get(word, 0) + 1
+        word_freq = Counter(_WORD_RE.findall(text.lower()))
         
-        # Score sentences based on word frequency
+        # Score sentences based on word frequency or sentence similarity
+        tokenized = [(sentence, _WORD_RE.findall(sentence.lower())) for sentence in sentences]
+        tokenized = [(sentence, words) for sentence, words in tokenized if words]
         sentence_scores = {}
-        for sentence in sentences:
-            sentence_words = sentence.lower().split()
-            score = 0
-            word_count = 0
-            
-            for word in sentence_words:
-                word = re.sub(r'[^\w]', '', word)
-                if word in word_freq:
-                    score += word_freq[word]
-                    word_count += 1
-            
-            if word_count > 0:
-                sentence_scores[sentence] = score / word_count
+        if tokenized:
+            sentence_words = [words for _, words in tokenized]
+            if (method == "textrank" and len(sentence_words) <= _TEXTRANK_MAX_SENTENCES
+                    and len(word_freq) <= _TEXTRANK_MAX_TERMS):
+                scores = _textrank_scores(sentence_words)
+            else:
+                scores = _frequency_scores(sentence_words, word_freq)
+            sentence_scores = dict(zip((sentence for sentence, _ in tokenized), scores.tolist()))
         
         # Get top sentences
-        top_sentences = sorted(sentence_scores.items(), key=lambda x: x[1], reverse=True)
-        summary_sentences = [sent[0] for sent in top_sentences[:max_sentences]]
+        top_sentences = heapq.nlargest(max_sentences, sentence_scores.items(), key=itemgetter(1))
+        # Sentences keep their terminal punctuation, so join with a plain space
+        summary = ' '.join(sent[0] for sent in top_sentences)
         
         return {
             "original_length": len(text),
-            "summary_length": len('. '.join(summary_sentences)),
-            "compression_ratio": len('. '.join(summary_sentences)) / len(text) if text else 0,
-            "summary": '. '.join(summary_sentences),
-            "key_words": list(sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10])
+            "summary_length": len(summary),
+            "compression_ratio": len(summary) / len(text) if text else 0,
+            "summary": summary,
+            "key_words": word_freq.most_common(10)
         }
     
     def research_helper(self, topic: str) -> Dict[str, Any]:
         """Help with research by providing structured information"""
         return {
             "topic": topic,
-            "research_framework": {
-                "key_questions": [
-                    f"What is {topic}?",
-                    f"Why is {topic} important?",
-                    f"What are the current trends in {topic}?",
-                    f"What are the challenges related to {topic}?",
-                    f"What is the future outlook for {topic}?"
-                ],
-                "research_areas": [
-                    "Background and definition",
-                    "Current state and trends",
-                    "Key players and stakeholders",
-                    "Challenges and opportunities",
-                    "Future predictions and implications"
-                ],
-                "suggested_sources": [
-                    "Academic databases",
-                    "Industry reports",
-                    "Government publications",
-                    "Expert interviews",
-                    "Case studies"
-                ]
-            },
+            "research_framework": dict(_research_framework(topic)),
             "analysis_framework": {
                 "strengths": [],
                 "weaknesses": [], 
@@ -184,30 +349,15 @@ class AgentTools:
     
     def creative_generator(self, prompt: str, creative_type: str = "ideas") -> Dict[str, Any]:
         """Generate creative content and ideas"""
-        templates = {
-            "story_outline": {
-                "structure": ["Setup", "Inciting Incident", "Rising Action", "Climax", "Falling Action", "Resolution"],
-                "elements": ["Character", "Setting", "Conflict", "Theme", "Plot Twist"]
-            },
-            "brainstorm": {
-                "techniques": ["Mind Mapping", "SCAMPER", "Six Thinking Hats", "Random Word", "What If..."],
-                "categories": ["Traditional", "Innovative", "Disruptive", "Improvement", "Combination"]
-            },
-            "content_ideas": {
-                "formats": ["Blog Post", "Video", "Infographic", "Podcast", "Social Media", "Newsletter"],
-                "angles": ["How-to", "List", "Case Study", "Interview", "Review", "Comparison"]
-            }
-        }
-        
         result = {
             "prompt": prompt,
             "creative_type": creative_type,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": _now_iso(),
             "suggestions": []
         }
         
-        if creative_type in templates:
-            result["framework"] = templates[creative_type]
+        if creative_type in _CREATIVE_TEMPLATES:
+            result["framework"] = dict(_CREATIVE_TEMPLATES[creative_type])
         
         # Generate basic creative suggestions based on prompt
         keywords = prompt.lower().split()
@@ -224,74 +374,27 @@ class AgentTools:
 class TaskPlanner:
     """Plan and break down complex tasks"""
     
-    def __init__(self):
-        self.task_templates = {
-            "coding_project": [
-                "Define requirements",
-                "Design architecture", 
-                "Set up development environment",
-                "Implement core features",
-                "Add error handling",
-                "Write tests",
-                "Documentation",
-                "Code review",
-                "Deployment preparation"
-            ],
-            "research_project": [
-                "Define research question",
-                "Literature review",
-                "Methodology selection",
-                "Data collection",
-                "Data analysis", 
-                "Results interpretation",
-                "Report writing",
-                "Peer review",
-                "Presentation preparation"
-            ],
-            "content_creation": [
-                "Topic research",
-                "Audience analysis",
-                "Content outline",
-                "First draft",
-                "Review and edit",
-                "Visual elements",
-                "SEO optimization",
-                "Proofreading",
-                "Publishing and promotion"
-            ]
-        }
+    __slots__ = ()
+    
+    task_templates = _TASK_TEMPLATES
     
     def create_task_plan(self, task_description: str, task_type: str = "general") -> Dict[str, Any]:
         """Create a structured task plan"""
         plan = {
             "task": task_description,
             "type": task_type,
-            "created": datetime.now().isoformat(),
+            "created": _now_iso(),
             "estimated_duration": "To be determined",
             "priority": "Medium",
             "steps": []
         }
         
-        if task_type in self.task_templates:
-            plan["steps"] = [
-                {
-                    "step_number": i + 1,
-                    "title": step,
-                    "status": "Not Started",
-                    "estimated_time": "TBD",
-                    "dependencies": []
-                }
-                for i, step in enumerate(self.task_templates[task_type])
-            ]
-        else:
-            # Generic task breakdown
-            plan["steps"] = [
-                {"step_number": 1, "title": "Analyze requirements", "status": "Not Started"},
-                {"step_number": 2, "title": "Plan approach", "status": "Not Started"},
-                {"step_number": 3, "title": "Execute main task", "status": "Not Started"},
-                {"step_number": 4, "title": "Review and refine", "status": "Not Started"},
-                {"step_number": 5, "title": "Finalize and deliver", "status": "Not Started"}
-            ]
+        # Fall back to a generic task breakdown for unknown task types
+        template = _TASK_TEMPLATES.get(task_type, _GENERIC_TASK_STEPS)
+        plan["steps"] = [
+            {"step_number": i + 1, "title": step, **_STEP_DEFAULTS}
+            for i, step in enumerate(template)
+        ]
         
         return plan
 
@@ -1,20 +1,22 @@
 import streamlit as st
-import os
 from dotenv import load_dotenv
-from groq import Groq
+from groq import Groq, APIConnectionError, AuthenticationError
+import httpx
 import json
+from collections import deque
 from datetime import datetime
-import pandas as pd
+from itertools import islice
 import time
-from typing import List, Dict, Any
-import base64
+from typing import Dict, Any
 
 # Import configuration
 try:
     from config import (
-        AVAILABLE_MODELS, AGENT_TYPES, APP_TITLE, APP_ICON, 
-        ERROR_MESSAGES, SUCCESS_MESSAGES, get_model_info, 
-        validate_config, GROQ_API_KEY
+        AGENT_TYPES, APP_TITLE, APP_ICON, 
+        ERROR_MESSAGES, get_model_info, 
+        validate_config, GROQ_API_KEY, MAX_CONVERSATION_HISTORY,
+        AGENT_TYPE_KEYS, AGENT_TYPE_INDEX, AVAILABLE_MODEL_KEYS, AVAILABLE_MODEL_INDEX,
+        HEALTH_CHECK_MODEL
     )
 except ImportError:
     st.error("❌ Could not import config.py. Make sure config.py is in the same directory as app.py")
@@ -36,7 +38,7 @@ st.set_page_config(
 )
 
 # Custom CSS for better styling
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     .main-header {
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
@@ -56,22 +58,6 @@ st.markdown("""
         border-left: 4px solid #667eea;
     }
     
-    .chat-message {
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 1rem 0;
-    }
-    
-    .user-message {
-        background-color: #e3f2fd;
-        border-left: 4px solid #2196f3;
-    }
-    
-    .agent-message {
-        background-color: #f3e5f5;
-        border-left: 4px solid #9c27b0;
-    }
-    
     .metric-card {
         background: white;
         padding: 1rem;
@@ -91,6 +77,11 @@ st.markdown("""
         font-weight: bold;
     }
     
+    .status-unknown {
+        color: #9e9e9e;
+        font-weight: bold;
+    }
+    
     .model-info {
         background: #f8f9fa;
         padding: 1rem;
@@ -107,7 +98,32 @@ st.markdown("""
         margin: 1rem 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Collapse indentation once at import to shrink the payload sent on every rerun
+CUSTOM_CSS = " ".join(CUSTOM_CSS.split())
+
+def _inject_css():
+    """Inject the custom stylesheet"""
+    # Must run on every rerun: Streamlit removes elements a rerun does not re-emit
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+_inject_css()
+
+# Canned prompts for the Example and quick-action buttons, built once at import
+EXAMPLES = {
+    "Code Assistant": "Can you help me optimize this Python function for better performance?",
+    "Research Analyst": "What are the current trends in artificial intelligence adoption?",
+    "Creative Writer": "Help me write a short story about time travel.",
+    "General Assistant": "Explain the concept of quantum computing in simple terms."
+}
+
+QUICK_ACTIONS = {
+    "📝 Code Review": "Please review this code and suggest improvements:",
+    "🧠 Explain Concept": "Can you explain the following concept in detail:",
+    "🔧 Problem Solving": "Help me solve this problem step by step:",
+    "💡 Creative Ideas": "Give me creative ideas for:",
+}
 
 # Initialize Groq client with proper error handling
 @st.cache_resource
@@ -118,18 +134,16 @@ def init_groq_client():
         st.stop()
     
     try:
-        # Initialize Groq client
-        client = Groq(api_key=GROQ_API_KEY)
-        
-        # Test connection with fastest available model
-        test_response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": "test"}],
-            max_tokens=1
+        # Initialize Groq client on a pooled keep-alive HTTP/2 connection; cache_resource keeps the pool across reruns.
+        # The sync client is deliberate: scripts run on threads without an event loop, so an AsyncGroq pool
+        # would be tied to the throwaway loop of each asyncio.run() and could not be reused between reruns.
+        http_client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=httpx.Timeout(connect=5.0, read=60.0, write=5.0, pool=5.0)
         )
-        
-        st.success(SUCCESS_MESSAGES["connection_established"])
-        return client
+        # No startup ping: the first real request validates the key, and the sidebar test button checks on demand.
+        return Groq(api_key=GROQ_API_KEY, http_client=http_client)
         
     except Exception as e:
         st.error(f"❌ Failed to initialize Groq client: {str(e)}")
@@ -142,7 +156,7 @@ def init_groq_client():
 class KarbonAgent:
     def __init__(self, client: Groq):
         self.client = client
-        self.conversation_history = []
+        self.conversation_history = deque(maxlen=MAX_CONVERSATION_HISTORY)
         
     def get_response(self, message: str, agent_type: str, model: str = None, temperature: float = None) -> str:
         """Get response from Groq API with improved error handling"""
@@ -159,20 +173,35 @@ class KarbonAgent:
             ]
             
             # Add conversation history (last 10 messages to manage context length)
-            messages.extend(self.conversation_history[-10:])
+            history = self.conversation_history
+            messages.extend(islice(history, max(0, len(history) - 10), None))
             messages.append({"role": "user", "content": message})
             
-            with st.spinner(f"🤔 {agent_type} is thinking..."):
-                response = self.client.chat.completions.create(
-                    model=selected_model,
-                    messages=messages,
-                    temperature=selected_temperature,
-                    max_tokens=max_tokens,
-                    top_p=1,
-                    stream=False
-                )
+            response = self.client.chat.completions.create(
+                model=selected_model,
+                messages=messages,
+                temperature=selected_temperature,
+                max_tokens=max_tokens,
+                top_p=1,
+                stream=True
+            )
             
-            ai_response = response.choices[0].message.content
+            # Render tokens as they arrive instead of waiting for the full completion
+            placeholder = st.empty()
+            buffer = ""
+            try:
+                for chunk in response:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        buffer += delta
+                        placeholder.markdown(buffer + "▌")
+            finally:
+                # Drop the cursor even when the stream fails partway through
+                placeholder.markdown(buffer)
+            
+            ai_response = buffer
+            # A completed stream proves the key and connection work
+            st.session_state.last_health_ok = True
             
             # Update conversation history
             self.conversation_history.extend([
@@ -186,6 +215,11 @@ class KarbonAgent:
             error_msg = str(e)
             st.error(f"❌ Error getting response: {error_msg}")
             
+            # Nothing checks the key at startup, so requests drive the status badge; chat_panel
+            # reruns the whole app when this changes so the sidebar redraws it
+            if isinstance(e, (AuthenticationError, APIConnectionError)):
+                st.session_state.last_health_ok = False
+            
             # Provide specific error guidance using config
             if "rate_limit" in error_msg.lower():
                 return ERROR_MESSAGES["rate_limit"]
@@ -198,20 +232,167 @@ class KarbonAgent:
     
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.conversation_history.clear()
 
-def test_groq_connection(client, model):
-    """Test Groq API connection"""
+def test_groq_connection(client):
+    """Test Groq API connection (liveness only; does not check a specific model's availability)"""
     try:
         response = client.chat.completions.create(
-            model=model,
+            model=HEALTH_CHECK_MODEL,
             messages=[{"role": "user", "content": "Hi"}],
-            max_tokens=5
+            max_tokens=1
         )
         return True, "Connection successful"
     except Exception as e:
         return False, str(e)
 
+def _queue_prompt(prompt: str):
+    """Queue a prompt for the chat panel to send on its next run"""
+    st.session_state.pending_prompt = prompt
+
+def _submit(user_input: str, chat_container, selected_agent: str, selected_model: str,
+            temperature: float, config: Dict[str, Any]):
+    """Record a user turn, stream the agent's reply into the chat and record it"""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    # Add user message to history
+    st.session_state.chat_history.append({
+        "role": "user",
+        "content": user_input,
+        "timestamp": timestamp
+    })
+    st.session_state.user_msg_count += 1
+    
+    with chat_container:
+        with st.chat_message("user", avatar="👤"):
+            st.markdown(user_input)
+            st.caption(f"📅 {timestamp}")
+        
+        # Get AI response, streamed straight into the new assistant message
+        with st.chat_message("assistant", avatar=config['icon']):
+            ai_response = st.session_state.agent.get_response(
+                user_input, 
+                selected_agent,
+                selected_model,
+                temperature
+            )
+            st.caption(f"📅 {timestamp}")
+    
+    # Add AI response to history
+    st.session_state.chat_history.append({
+        "role": "assistant",
+        "content": ai_response,
+        "timestamp": timestamp,
+        "model": selected_model,
+        "temperature": temperature
+    })
+    st.session_state.agent_msg_count += 1
+
+@st.fragment
+def chat_panel(selected_agent: str, selected_model: str, temperature: float, config: Dict[str, Any],
+               model_info: Dict[str, Any]):
+    """Render the chat and statistics columns; interactions here rerun only this fragment"""
+    # Main content area
+    col1, col2 = st.columns([3, 1])
+    
+    with col1:
+        st.subheader(f"💬 Chat with {config['icon']} {selected_agent}")
+        
+        # Model indicator
+        model_name = model_info.get('name', selected_model)
+        st.caption(f"Using: {model_name} (Temperature: {temperature})")
+        
+        # Display welcome message if no chat history
+        if not st.session_state.chat_history:
+            st.info(f"👋 Hi! I'm your {selected_agent}. {config['description']}. How can I help you today?")
+        
+        # Display chat history
+        chat_container = st.container()
+        with chat_container:
+            for chat in st.session_state.chat_history:
+                if chat["role"] == "user":
+                    with st.chat_message("user", avatar="👤"):
+                        st.markdown(chat["content"])
+                        st.caption(f"📅 {chat.get('timestamp', '')}")
+                else:
+                    with st.chat_message("assistant", avatar=config['icon']):
+                        st.markdown(chat["content"])
+                        st.caption(f"📅 {chat.get('timestamp', '')}")
+        
+        # Chat input; Example and quick-action buttons queue their prompt via _queue_prompt
+        user_input = st.chat_input(f"Ask {selected_agent} anything...")
+        if not user_input:
+            user_input = st.session_state.pop("pending_prompt", None)
+        
+        # Handle example button
+        st.button("💡 Example", on_click=_queue_prompt, args=(EXAMPLES[selected_agent],))
+        
+        # Process user input
+        if user_input and user_input.strip():
+            first_turn = not st.session_state.chat_history
+            health_before = st.session_state.get("last_health_ok")
+            _submit(user_input, chat_container, selected_agent, selected_model, temperature, config)
+            # The sidebar's Export control and status badge sit outside this fragment, so redraw
+            # the whole app when the first turn adds Export or the request changed the badge
+            if first_turn or st.session_state.get("last_health_ok") != health_before:
+                st.rerun()
+    
+    with col2:
+        st.subheader("📊 Statistics")
+        
+        # Chat statistics
+        user_messages = st.session_state.user_msg_count
+        agent_messages = st.session_state.agent_msg_count
+        total_messages = user_messages + agent_messages
+        
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>{total_messages}</h3>
+            <p>Total Messages</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>{user_messages}</h3>
+            <p>Your Messages</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>{agent_messages}</h3>
+            <p>Agent Responses</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Quick actions
+        st.subheader("⚡ Quick Actions")
+        
+        for action, prompt in QUICK_ACTIONS.items():
+            st.button(
+                action,
+                use_container_width=True,
+                key=f"quick_{action}",
+                on_click=_queue_prompt,
+                args=(prompt,)
+            )
+        
+        # Recent topics
+        if st.session_state.chat_history:
+            st.subheader("📝 Recent Topics")
+            # Walk back from the newest message and stop after five user turns
+            recent_topics = []
+            for msg in reversed(st.session_state.chat_history):
+                if msg["role"] == "user":
+                    content = msg["content"]
+                    recent_topics.append(content[:40] + "..." if len(content) > 40 else content)
+                    if len(recent_topics) == 5:
+                        break
+            
+            for i, topic in enumerate(recent_topics):
+                st.caption(f"{i+1}. {topic}")
+
 def main():
     # Initialize session state
     if "groq_client" not in st.session_state:
@@ -223,6 +404,13 @@ def main():
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
     
+    # Running message counts so the statistics panel never rescans the history
+    if "user_msg_count" not in st.session_state:
+        st.session_state.user_msg_count = 0
+    
+    if "agent_msg_count" not in st.session_state:
+        st.session_state.agent_msg_count = 0
+    
     if "selected_agent" not in st.session_state:
         st.session_state.selected_agent = "General Assistant"
     
@@ -244,8 +432,8 @@ def main():
         # Agent selection
         selected_agent = st.selectbox(
             "Select Agent Type:",
-            list(AGENT_TYPES.keys()),
-            index=list(AGENT_TYPES.keys()).index(st.session_state.selected_agent)
+            AGENT_TYPE_KEYS,
+            index=AGENT_TYPE_INDEX[st.session_state.selected_agent]
         )
         
         if selected_agent != st.session_state.selected_agent:
@@ -267,14 +455,13 @@ def main():
         st.subheader("⚙️ Model Parameters")
         
         # Model selection
-        available_models = list(AVAILABLE_MODELS.keys())
         default_model = config["model"]
         current_model = st.session_state.selected_model or default_model
         
         selected_model = st.selectbox(
             "Select Model:",
-            available_models,
-            index=available_models.index(current_model) if current_model in available_models else 0,
+            AVAILABLE_MODEL_KEYS,
+            index=AVAILABLE_MODEL_INDEX.get(current_model, 0),
             help="Choose the AI model for this agent"
         )
         
@@ -320,10 +507,9 @@ def main():
         with col1:
             if st.button("🔄 Test", use_container_width=True):
                 with st.spinner("Testing..."):
-                    is_connected, status_msg = test_groq_connection(
-                        st.session_state.groq_client, 
-                        selected_model
-                    )
+                    is_connected, status_msg = test_groq_connection(st.session_state.groq_client)
+                    st.session_state.last_health_ok = is_connected
+                    st.session_state.last_health_ts = time.time()
                     if is_connected:
                         st.success("🟢 Online")
                     else:
@@ -331,16 +517,13 @@ def main():
                         st.caption(status_msg)
         
         with col2:
-            # Show current status
-            try:
-                # Quick status check
-                test_response = st.session_state.groq_client.chat.completions.create(
-                    model=selected_model,
-                    messages=[{"role": "user", "content": "test"}],
-                    max_tokens=1
-                )
+            # Show the result of the last test or failed request instead of probing the API on every rerun
+            health_ok = st.session_state.get("last_health_ok")
+            if health_ok is None:
+                st.markdown('<p class="status-unknown">⚪ Not tested</p>', unsafe_allow_html=True)
+            elif health_ok:
                 st.markdown('<p class="status-online">🟢 Ready</p>', unsafe_allow_html=True)
-            except Exception as e:
+            else:
                 st.markdown('<p class="status-offline">🔴 Error</p>', unsafe_allow_html=True)
         
         # Conversation controls
@@ -351,6 +534,8 @@ def main():
             if st.button("🗑️ Clear", use_container_width=True):
                 st.session_state.agent.clear_history()
                 st.session_state.chat_history = []
+                st.session_state.user_msg_count = 0
+                st.session_state.agent_msg_count = 0
                 st.success("✅ Cleared!")
                 st.rerun()
         
@@ -365,183 +550,16 @@ def main():
                 }
                 
                 json_string = json.dumps(chat_data, indent=2)
-                b64 = base64.b64encode(json_string.encode()).decode()
-                href = f'<a href="data:application/json;base64,{b64}" download="karbon_chat_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json">📥 Download</a>'
-                st.markdown(href, unsafe_allow_html=True)
-
-    # Main content area
-    col1, col2 = st.columns([3, 1])
-    
-    with col1:
-        st.subheader(f"💬 Chat with {config['icon']} {selected_agent}")
-        
-        # Model indicator
-        model_name = get_model_info(selected_model).get('name', selected_model)
-        st.caption(f"Using: {model_name} (Temperature: {temperature})")
-        
-        # Display welcome message if no chat history
-        if not st.session_state.chat_history:
-            st.info(f"👋 Hi! I'm your {selected_agent}. {config['description']}. How can I help you today?")
-        
-        # Display chat history
-        chat_container = st.container()
-        with chat_container:
-            for chat in st.session_state.chat_history:
-                if chat["role"] == "user":
-                    st.markdown(f"""
-                    <div class="chat-message user-message">
-                        <strong>👤 You:</strong><br>
-                        {chat["content"]}
-                        <br><small>📅 {chat.get("timestamp", "")}</small>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div class="chat-message agent-message">
-                        <strong>{config['icon']} {selected_agent}:</strong><br>
-                        {chat["content"]}
-                        <br><small>📅 {chat.get("timestamp", "")}</small>
-                    </div>
-                    """, unsafe_allow_html=True)
-        
-        # Chat input
-        with st.form(key="chat_form", clear_on_submit=True):
-            user_input = st.text_area(
-                "Your message:",
-                placeholder=f"Ask {selected_agent} anything...",
-                height=100,
-                key="user_input"
-            )
-            
-            col_send, col_example = st.columns([1, 1])
-            
-            with col_send:
-                send_button = st.form_submit_button("🚀 Send", use_container_width=True)
-            
-            with col_example:
-                example_button = st.form_submit_button("💡 Example", use_container_width=True)
-        
-        # Handle example button
-        if example_button:
-            examples = {
-                "Code Assistant": "Can you help me optimize this Python function for better performance?",
-                "Research Analyst": "What are the current trends in artificial intelligence adoption?",
-                "Creative Writer": "Help me write a short story about time travel.",
-                "General Assistant": "Explain the concept of quantum computing in simple terms."
-            }
-            user_input = examples[selected_agent]
-            send_button = True
-        
-        # Process user input
-        if send_button and user_input and user_input.strip():
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            # Add user message to history
-            st.session_state.chat_history.append({
-                "role": "user",
-                "content": user_input,
-                "timestamp": timestamp
-            })
-            
-            # Get AI response
-            ai_response = st.session_state.agent.get_response(
-                user_input, 
-                selected_agent,
-                selected_model,
-                temperature
-            )
-            
-            # Add AI response to history
-            st.session_state.chat_history.append({
-                "role": "assistant",
-                "content": ai_response,
-                "timestamp": timestamp,
-                "model": selected_model,
-                "temperature": temperature
-            })
-            
-            st.rerun()
-    
-    with col2:
-        st.subheader("📊 Statistics")
-        
-        # Chat statistics
-        total_messages = len(st.session_state.chat_history)
-        user_messages = len([msg for msg in st.session_state.chat_history if msg["role"] == "user"])
-        agent_messages = len([msg for msg in st.session_state.chat_history if msg["role"] == "assistant"])
-        
-        st.markdown(f"""
-        <div class="metric-card">
-            <h3>{total_messages}</h3>
-            <p>Total Messages</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown(f"""
-        <div class="metric-card">
-            <h3>{user_messages}</h3>
-            <p>Your Messages</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown(f"""
-        <div class="metric-card">
-            <h3>{agent_messages}</h3>
-            <p>Agent Responses</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Quick actions
-        st.subheader("⚡ Quick Actions")
-        
-        quick_actions = {
-            "📝 Code Review": "Please review this code and suggest improvements:",
-            "🧠 Explain Concept": "Can you explain the following concept in detail:",
-            "🔧 Problem Solving": "Help me solve this problem step by step:",
-            "💡 Creative Ideas": "Give me creative ideas for:",
-        }
-        
-        for action, prompt in quick_actions.items():
-            if st.button(action, use_container_width=True, key=f"quick_{action}"):
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Add quick action to chat
-                st.session_state.chat_history.append({
-                    "role": "user",
-                    "content": prompt,
-                    "timestamp": timestamp
-                })
-                
-                # Get AI response
-                ai_response = st.session_state.agent.get_response(
-                    prompt, 
-                    selected_agent,
-                    selected_model,
-                    temperature
+                st.download_button(
+                    "📥 Download",
+                    data=json_string,
+                    file_name=f"karbon_chat_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                    mime="application/json",
+                    use_container_width=True
                 )
-                
-                # Add AI response to history
-                st.session_state.chat_history.append({
-                    "role": "assistant",
-                    "content": ai_response,
-                    "timestamp": timestamp,
-                    "model": selected_model,
-                    "temperature": temperature
-                })
-                
-                st.rerun()
-        
-        # Recent topics
-        if st.session_state.chat_history:
-            st.subheader("📝 Recent Topics")
-            recent_topics = [
-                msg["content"][:40] + "..." if len(msg["content"]) > 40 else msg["content"]
-                for msg in st.session_state.chat_history[-5:]
-                if msg["role"] == "user"
-            ]
-            
-            for i, topic in enumerate(recent_topics):
-                st.caption(f"{i+1}. {topic}")
+
+    # Chat and statistics panel; reruns on its own when the user sends a message
+    chat_panel(selected_agent, selected_model, temperature, config, model_info)
 
     # Footer
     st.markdown("---")
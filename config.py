@@ -3,6 +3,7 @@ Configuration settings for Karbon AI Agent
 Updated with current Groq API models (August 2024)
 """
 import os
+from functools import lru_cache
 from typing import Dict, Any
 from dotenv import load_dotenv
 
@@ -39,6 +40,10 @@ AVAILABLE_MODELS = {
     }
 }
 
+# Model ids in display order, and their positions for selectbox defaults
+AVAILABLE_MODEL_KEYS = list(AVAILABLE_MODELS.keys())
+AVAILABLE_MODEL_INDEX = {model_id: i for i, model_id in enumerate(AVAILABLE_MODEL_KEYS)}
+
 # Preview models (for testing only - not recommended for production)
 PREVIEW_MODELS = {
     "deepseek-r1-distill-llama-70b": {
@@ -59,6 +64,9 @@ PREVIEW_MODELS = {
     }
 }
 
+# Model used for liveness pings; always the fastest/cheapest tier so checks don't spend chat-model quota
+HEALTH_CHECK_MODEL = "llama-3.1-8b-instant"
+
 # Default model parameters
 DEFAULT_TEMPERATURE = 0.7
 DEFAULT_MAX_TOKENS = 1024
@@ -121,6 +129,10 @@ AGENT_TYPES = {
     }
 }
 
+# Agent names in display order, and their positions for selectbox defaults
+AGENT_TYPE_KEYS = list(AGENT_TYPES.keys())
+AGENT_TYPE_INDEX = {name: i for i, name in enumerate(AGENT_TYPE_KEYS)}
+
 # File upload settings
 ALLOWED_FILE_TYPES = ['txt', 'pdf', 'docx', 'py', 'js', 'html', 'css', 'json', 'md', 'csv']
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
@@ -161,8 +173,9 @@ ENABLE_CONVERSATION_EXPORT = True
 ENABLE_MODEL_SWITCHING = True
 ENABLE_TEMPERATURE_ADJUSTMENT = True
 
+@lru_cache(maxsize=None)
 def get_model_info(model_id: str) -> Dict[str, Any]:
-    """Get detailed information about a specific model"""
+    """Get detailed information about a specific model (cached; treat the result as read-only)"""
     if model_id in AVAILABLE_MODELS:
         return AVAILABLE_MODELS[model_id]
     elif model_id in PREVIEW_MODELS:
@@ -170,6 +183,7 @@ def get_model_info(model_id: str) -> Dict[str, Any]:
     else:
         return {"error": f"Model {model_id} not found"}
 
+@lru_cache(maxsize=None)
 def get_recommended_model(task_type: str) -> str:
     """Get recommended model for a specific task type"""
     return MODEL_SELECTION_GUIDE.get(task_type, "llama-3.1-8b-instant")
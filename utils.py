@@ -1,51 +1,147 @@
 """
 Utility functions for Karbon AI Agent
 """
-import json
-import base64
+import binascii
+import re
+import sys
+import time
+import warnings
 import streamlit as st
+from itertools import islice
 from datetime import datetime
-from typing import List, Dict, Any
-import pandas as pd
+from typing import List, Dict, Any, Iterable, NamedTuple, Optional, Tuple, Union
 
-def export_chat_history(chat_history: List[Dict], agent_type: str) -> str:
-    """Export chat history as JSON"""
-    export_data = {
+# Fastest available JSON encoder: orjson, then ujson, then the stdlib
+try:
+    import orjson as _json
+except ImportError:
+    try:
+        import ujson as _json
+    except ImportError:
+        import json as _json
+
+# Two-space indented JSON encoder that always returns UTF-8 bytes
+if _json.__name__ == "orjson":
+    def _dumps_indent(obj: Any) -> bytes:
+        """Serialize obj with orjson, which already returns bytes"""
+        return _json.dumps(obj, option=_json.OPT_INDENT_2)
+else:
+    def _dumps_indent(obj: Any) -> bytes:
+        """Serialize obj with ujson or the stdlib and encode it as UTF-8"""
+        return _json.dumps(obj, indent=2).encode("utf-8")
+
+# SIMD base64 from pybase64 when installed, stdlib otherwise
+try:
+    import pybase64
+    _b64encode = pybase64.b64encode_as_string
+except ImportError:
+    # binascii is the C encoder under base64.b64encode, called without the wrapper;
+    # any Python-level lookup-table encoder is two orders of magnitude slower
+    def _b64encode(data: bytes) -> str:
+        """Base64-encode data to an ASCII str"""
+        return binascii.b2a_base64(data, newline=False).decode("ascii")
+
+class Message(NamedTuple):
+    """A single chat message"""
+    role: str
+    content: str
+    timestamp: str
+
+# SessionManager stores Message tuples; app.py keeps plain dicts with extra keys
+ChatMessage = Union[Message, Dict[str, Any]]
+
+def _as_dict(msg: ChatMessage) -> Dict[str, Any]:
+    """Return a message as a dict, whichever shape it is stored in"""
+    return msg._asdict() if isinstance(msg, Message) else msg
+
+# Interned message roles; add_message interns incoming roles so they compare by identity
+USER_ROLE = sys.intern("user")
+ASSISTANT_ROLE = sys.intern("assistant")
+
+# Display format for message timestamps
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def _now_str() -> str:
+    """Current local time in TIMESTAMP_FORMAT"""
+    return time.strftime(TIMESTAMP_FORMAT)
+
+# Constant fragments of the agent card markup, filled in by create_agent_card
+_CARD_T = (
+    '<div class="agent-card"><div style="display: flex; align-items: center; margin-bottom: 10px;">'
+    '<span style="font-size: 24px; margin-right: 10px;">',
+    '</span><h3 style="margin: 0;">',
+    '</h3></div><p style="margin: 5px 0; color: #666;">',
+    '</p><small style="color: #888;"><strong>Model:</strong> ',
+    '</small></div>'
+)
+
+# Fenced code block with optional language tag. ASCII responses are already
+# scanned as one-byte units, so a bytes twin of this pattern would gain nothing
+_CODE_FENCE_RE = re.compile(r'```(\w+)?\n(.*?)```', re.DOTALL)
+
+def _export_data(chat_history: List[ChatMessage], agent_type: str) -> Dict[str, Any]:
+    """Build the export envelope around the chat history"""
+    return {
         "export_timestamp": datetime.now().isoformat(),
         "agent_type": agent_type,
         "total_messages": len(chat_history),
-        "chat_history": chat_history
+        "chat_history": [_as_dict(msg) for msg in chat_history]
     }
-    
-    return json.dumps(export_data, indent=2)
 
-def create_download_link(data: str, filename: str, link_text: str) -> str:
-    """Create a download link for data"""
-    b64 = base64.b64encode(data.encode()).decode()
+def export_chat_history(chat_history: List[ChatMessage], agent_type: str) -> bytes:
+    """Export chat history as UTF-8 JSON bytes for st.download_button"""
+    # SessionManager.add_message keeps the list it last appended to pre-serialized;
+    # the cache holds that list itself, so a reassigned history never matches it
+    if (chat_history is st.session_state.get("export_owner")
+            and st.session_state.get("export_count") == len(chat_history)):
+        return _export_from_cache(agent_type)
+    return _dumps_indent(_export_data(chat_history, agent_type)) + b"\n"
+
+def _export_from_cache(agent_type: str) -> bytes:
+    """Wrap the session's pre-serialized messages in the export envelope"""
+    count = st.session_state.export_count
+    header = _dumps_indent({
+        "export_timestamp": datetime.now().isoformat(),
+        "agent_type": agent_type,
+        "total_messages": count
+    })
+    # Reopen the header object (drop its closing "\n}") and append the message array
+    if not count:
+        return header[:-2] + b',\n  "chat_history": []\n}\n'
+    return b"".join((
+        header[:-2], b',\n  "chat_history": [\n    ',
+        st.session_state.export_cache, b"\n  ]\n}\n"
+    ))
+
+def create_download_link(data: Union[str, bytes], filename: str, link_text: str) -> str:
+    """Create a download link for data (deprecated: use st.download_button)"""
+    warnings.warn(
+        "create_download_link is deprecated; pass export bytes to st.download_button instead",
+        DeprecationWarning,
+        stacklevel=2
+    )
+    # UTF-8 encoding an ASCII str is already a plain copy; pass bytes to skip it entirely
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    b64 = _b64encode(data)
     href = f'<a href="data:application/json;base64,{b64}" download="{filename}">{link_text}</a>'
     return href
 
-def format_timestamp(timestamp: str = None) -> str:
+def format_timestamp(timestamp: Optional[str] = None) -> str:
     """Format timestamp for display"""
     if timestamp is None:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = _now_str()
     return timestamp
 
 def truncate_text(text: str, max_length: int = 100) -> str:
     """Truncate text with ellipsis"""
-    if len(text) <= max_length:
-        return text
-    return text[:max_length] + "..."
+    return text if len(text) <= max_length else text[:max_length] + "..."
 
 def validate_api_key(api_key: str) -> bool:
     """Validate Groq API key format"""
-    if not api_key:
-        return False
-    if len(api_key) < 10:
-        return False
-    return True
+    return bool(api_key) and len(api_key) >= 10
 
-def get_conversation_summary(chat_history: List[Dict]) -> Dict[str, Any]:
+def get_conversation_summary(chat_history: List[ChatMessage]) -> Dict[str, Any]:
     """Get summary statistics of conversation"""
     if not chat_history:
         return {
@@ -57,53 +153,81 @@ def get_conversation_summary(chat_history: List[Dict]) -> Dict[str, Any]:
             "average_message_length": 0
         }
     
-    user_messages = [msg for msg in chat_history if msg["role"] == "user"]
-    agent_messages = [msg for msg in chat_history if msg["role"] == "assistant"]
-    
-    message_lengths = [len(msg["content"]) for msg in chat_history]
-    avg_length = sum(message_lengths) / len(message_lengths) if message_lengths else 0
+    # Only the session's own history is cached; SessionManager drops the entry on every change
+    is_session_history = chat_history is st.session_state.get("chat_history")
+    if is_session_history:
+        cached = st.session_state.get("summary_cache")
+        # The cache holds the list itself, so a reassigned history never matches a stale entry
+        if cached is not None and cached[0] is chat_history and cached[1] == len(chat_history):
+            return cached[2]
     
-    timestamps = [msg.get("timestamp") for msg in chat_history if msg.get("timestamp")]
+    # Tally roles, lengths and timestamp bounds in a single pass
+    user_count: int = 0
+    agent_count: int = 0
+    total_length: int = 0
+    first_ts: Optional[str] = None
+    last_ts: Optional[str] = None
+    for msg in chat_history:
+        if isinstance(msg, Message):
+            role, content, ts = msg
+        else:
+            role, content, ts = msg["role"], msg["content"], msg.get("timestamp")
+        if role == USER_ROLE:
+            user_count += 1
+        elif role == ASSISTANT_ROLE:
+            agent_count += 1
+        total_length += len(content)
+        if ts:
+            if first_ts is None or ts < first_ts:
+                first_ts = ts
+            if last_ts is None or ts > last_ts:
+                last_ts = ts
     
-    return {
+    summary = {
         "total_messages": len(chat_history),
-        "user_messages": len(user_messages),
-        "agent_messages": len(agent_messages),
-        "first_message_time": min(timestamps) if timestamps else None,
-        "last_message_time": max(timestamps) if timestamps else None,
-        "average_message_length": round(avg_length, 2)
+        "user_messages": user_count,
+        "agent_messages": agent_count,
+        "first_message_time": first_ts,
+        "last_message_time": last_ts,
+        "average_message_length": round(total_length / len(chat_history), 2)
     }
+    if is_session_history:
+        st.session_state.summary_cache = (chat_history, len(chat_history), summary)
+    return summary
+
+def _card_fragments(agent_name: str, config: Dict) -> Tuple[str, ...]:
+    """Interleave the card markup with one agent's fields"""
+    return (
+        _CARD_T[0], config['icon'],
+        _CARD_T[1], agent_name,
+        _CARD_T[2], config['description'],
+        _CARD_T[3], config.get('model', 'mixtral-8x7b-32768'),
+        _CARD_T[4]
+    )
 
 def create_agent_card(agent_name: str, config: Dict) -> str:
     """Create HTML card for agent display"""
-    return f"""
-    <div class="agent-card">
-        <div style="display: flex; align-items: center; margin-bottom: 10px;">
-            <span style="font-size: 24px; margin-right: 10px;">{config['icon']}</span>
-            <h3 style="margin: 0;">{agent_name}</h3>
-        </div>
-        <p style="margin: 5px 0; color: #666;">{config['description']}</p>
-        <small style="color: #888;"><strong>Model:</strong> {config.get('model', 'mixtral-8x7b-32768')}</small>
-    </div>
-    """
+    return "".join(_card_fragments(agent_name, config))
+
+def render_agent_cards(items: Iterable[Tuple[str, Dict]]) -> str:
+    """Create HTML for several agent cards in one buffer"""
+    buf: List[str] = []
+    for agent_name, config in items:
+        buf.extend(_card_fragments(agent_name, config))
+    return "".join(buf)
 
 def format_code_block(code: str, language: str = "") -> str:
     """Format code block for display"""
     return f"```{language}\n{code}\n```"
 
-def extract_code_from_response(response: str) -> List[Dict]:
+def extract_code_from_response(response: str) -> List[Dict[str, Any]]:
     """Extract code blocks from AI response"""
-    import re
-    
-    code_blocks = []
-    pattern = r'```(\w+)?\n(.*?)```'
-    matches = re.findall(pattern, response, re.DOTALL)
-    
-    for i, (language, code) in enumerate(matches):
+    code_blocks: List[Dict[str, Any]] = []
+    for i, match in enumerate(_CODE_FENCE_RE.finditer(response)):
         code_blocks.append({
             "id": i,
-            "language": language or "text",
-            "code": code.strip()
+            "language": match.group(1) or "text",
+            "code": match.group(2).strip()
         })
     
     return code_blocks
@@ -112,11 +236,16 @@ class SessionManager:
     """Manage Streamlit session state"""
     
     @staticmethod
-    def initialize_session():
+    def initialize_session() -> None:
         """Initialize session state variables"""
         if "chat_history" not in st.session_state:
             st.session_state.chat_history = []
         
+        if "export_cache" not in st.session_state:
+            st.session_state.export_cache = bytearray()
+            st.session_state.export_count = 0
+            st.session_state.export_owner = st.session_state.chat_history
+        
         if "selected_agent" not in st.session_state:
             st.session_state.selected_agent = "General Assistant"
         
@@ -127,29 +256,52 @@ class SessionManager:
             st.session_state.total_tokens_used = 0
     
     @staticmethod
-    def add_message(role: str, content: str, timestamp: str = None):
+    def add_message(role: str, content: str, timestamp: Optional[str] = None) -> None:
         """Add message to chat history"""
         if timestamp is None:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            timestamp = _now_str()
         
-        message = {
-            "role": role,
-            "content": content,
-            "timestamp": timestamp
-        }
+        role = sys.intern(role)
+        message = Message(role, content, timestamp)
+        
+        history = st.session_state.chat_history
+        history.append(message)
+        
+        # A history assigned directly (not via clear_history) restarts the cache on the new list;
+        # if it already held messages the count won't match and exports re-serialize instead
+        if st.session_state.export_owner is not history:
+            st.session_state.export_cache = bytearray()
+            st.session_state.export_count = 0
+            st.session_state.export_owner = history
         
-        st.session_state.chat_history.append(message)
+        # Keep the serialized history current so exports don't re-encode it; the
+        # fragments are indented one level deeper to sit inside the export's array
+        cache = st.session_state.export_cache
+        if cache:
+            cache += b",\n    "
+        cache += _dumps_indent(message._asdict()).replace(b"\n", b"\n    ")
+        st.session_state.export_count += 1
+        st.session_state.pop("summary_cache", None)
         
-        if role == "user":
+        if role is USER_ROLE:
             st.session_state.conversation_count += 1
     
     @staticmethod
-    def clear_history():
+    def clear_history() -> None:
         """Clear chat history"""
         st.session_state.chat_history = []
+        st.session_state.export_cache = bytearray()
+        st.session_state.export_count = 0
+        st.session_state.export_owner = st.session_state.chat_history
+        st.session_state.pop("summary_cache", None)
         st.session_state.conversation_count = 0
     
     @staticmethod
-    def get_recent_messages(count: int = 10) -> List[Dict]:
-        """Get recent messages from history"""
-        return st.session_state.chat_history[-count:] if st.session_state.chat_history else []
\ No newline at end of file
+    def get_recent_messages(count: int = 10) -> List[ChatMessage]:
+        """Get the last count messages from history (an empty list when count <= 0)"""
+        if count <= 0:
+            return []
+        # Walk back from the newest message; costs O(count) however long the history is
+        recent = list(islice(reversed(st.session_state.chat_history), count))
+        recent.reverse()
+        return recent